@@ -1,27 +1,127 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
-def load_data(file_path):
+# Copy-on-Write: seleksi kolom tidak langsung menyalin data, salinan baru
+# dibuat hanya saat kolom diubah. Pada pandas >= 3.0 ini sudah selalu aktif
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.options.mode.copy_on_write = True
+
+# --- Skema Dataset ---
+# Skema Telco Customer Churn sudah tetap, jadi didefinisikan sekali di sini
+
+# Kolom terpilih berdasarkan insight notebook
+SELECTED_COLUMNS = (
+    'InternetService', 
+    'OnlineSecurity', 
+    'TechSupport', 
+    'Contract', 
+    'PaymentMethod', 
+    'SeniorCitizen', 
+    'MonthlyCharges', 
+    'Churn'
+)
+
+CATEGORICAL_COLUMNS = (
+    'InternetService', 
+    'OnlineSecurity', 
+    'TechSupport', 
+    'Contract', 
+    'PaymentMethod', 
+    'Churn'
+)
+
+# Tipe data per kolom saat membaca CSV
+DTYPE_MAP = {
+    **{col: 'category' for col in CATEGORICAL_COLUMNS},
+    'SeniorCitizen': 'int8',
+    'MonthlyCharges': 'float32',
+    'TotalCharges': 'float32'
+}
+
+NA_VALUES = (' ', '')  # TotalCharges kosong untuk pelanggan baru
+
+BLOCK_SIZE = 8 << 20  # Ukuran satu chunk CSV (8 MB, sekitar 60 ribu baris)
+
+# Batas binning MonthlyCharges (Rendah / Sedang / Tinggi).
+# Rentang MonthlyCharges pada dataset adalah 18.25 - 118.75, dibagi menjadi
+# 3 bin dengan lebar sama seperti pd.cut(bins=3) pada notebook
+MC_EDGES = np.array([51.75, 85.25], dtype='float32')
+
+# Manual Mapping yang disesuaikan dengan file referensi
+MAPPINGS = {
+    'InternetService': {
+        'DSL': 0, 
+        'Fiber optic': 1, 
+        'No': 2
+    },
+    'OnlineSecurity': {
+        'No': 0, 
+        'No internet service': 1, 
+        'Yes': 2
+    },
+    'TechSupport': {
+        'No': 0, 
+        'No internet service': 1, 
+        'Yes': 2
+    },
+    'Contract': {
+        'Month-to-month': 0, 
+        'One year': 1, 
+        'Two year': 2
+    },
+    'PaymentMethod': {
+        'Bank transfer (automatic)': 0, 
+        'Credit card (automatic)': 1, 
+        'Electronic check': 2, 
+        'Mailed check': 3
+    },
+    'Churn': {
+        'No': 0, 
+        'Yes': 1
+    }
+}
+
+def to_arrow_type(dtype):
     """
-    Memuat dataset dari file CSV.
+    Mengubah nama tipe data pandas pada DTYPE_MAP menjadi tipe data Arrow.
+    Kolom category dibaca sebagai dictionary agar langsung menjadi Categorical.
+    """
+    if dtype == 'category':
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.from_numpy_dtype(np.dtype(dtype))
+
+def load_data(file_path, usecols=None, dtype=None, na_values=None, block_size=None):
+    """
+    Memuat dataset dari file CSV per chunk dengan pembaca CSV pyarrow (multithread).
+    Hanya kolom pada `usecols` yang di-parse, dengan tipe data dari `dtype`.
+    Nilai pada `na_values` langsung dibaca sebagai NaN.
+    Hasilnya berupa iterator DataFrame, satu per chunk berukuran `block_size` byte.
     """
     print(f"Memuat data dari: {file_path}")
-    return pd.read_csv(file_path)
+    read_options = pacsv.ReadOptions(use_threads=True, block_size=block_size)
+    convert_options = pacsv.ConvertOptions(
+        include_columns=list(usecols) if usecols else None,
+        column_types={col: to_arrow_type(t) for col, t in (dtype or {}).items()},
+        null_values=list(na_values) if na_values else None
+    )
+    reader = pacsv.open_csv(file_path, read_options=read_options, convert_options=convert_options)
+    return (batch.to_pandas() for batch in reader)
 
 def clean_data(df):
     """
-    Membersihkan data:
-    1. Mengubah TotalCharges menjadi numerik.
-    2. Menghapus baris dengan nilai null.
+    Membersihkan data dengan menghapus baris dengan nilai null.
+    TotalCharges sudah numerik sejak load_data (string kosong dibaca NaN).
     """
     print("Membersihkan data...")
-    # Mengubah TotalCharges ke numerik, error jadi NaN
-    df['TotalCharges'] = pd.to_numeric(df['TotalCharges'].str.strip(), errors='coerce')
-    
-    # Menghapus baris dengan nilai NaN (terutama dari TotalCharges)
-    df.dropna(inplace=True)
+    # Hanya TotalCharges yang bisa berisi NaN, jadi kolom lain tidak perlu diperiksa
+    if df['TotalCharges'].hasnans:
+        df.dropna(subset=['TotalCharges'], inplace=True)
     
     return df
 
@@ -29,40 +129,29 @@ def select_features(df):
     """
     Memilih fitur berdasarkan hasil analisis korelasi (Cramer's V > 0.3)
     dan fitur numerik penting.
+    Kolom lain sudah dilewati saat load_data, di sini hanya membuang
+    TotalCharges dan mengatur urutan kolom.
     """
     print("Melakukan seleksi fitur...")
-    # Kolom terpilih berdasarkan insight notebook
-    selected_columns = [
-        'InternetService', 
-        'OnlineSecurity', 
-        'TechSupport', 
-        'Contract', 
-        'PaymentMethod', 
-        'SeniorCitizen', 
-        'MonthlyCharges', 
-        'Churn'
-    ]
-    return df[selected_columns].copy()
+    # Tanpa .copy(), Copy-on-Write menunda salinan sampai ada kolom yang diubah
+    return df[list(SELECTED_COLUMNS)]
+
+def bin_values(values, edges):
+    """
+    Mengubah array numerik menjadi kode bin int8 berdasarkan batas `edges`.
+    Interval tertutup di kanan, sama seperti pd.cut.
+    """
+    return np.searchsorted(edges, values).astype('int8')
 
 def feature_engineering(df):
     """
-    Melakukan binning pada MonthlyCharges.
+    Melakukan binning pada MonthlyCharges dengan batas MC_EDGES.
+    Hasilnya langsung berupa kode integer (0 = Rendah, 1 = Sedang, 2 = Tinggi).
     """
     print("Melakukan Feature Engineering (Binning)...")
     # Binning MonthlyCharges menjadi 3 kategori
-    df['MonthlyCharges_Category'] = pd.cut(
-        df['MonthlyCharges'], 
-        bins=3, 
-        labels=['Rendah', 'Sedang', 'Tinggi']
-    )
-    
-    # Hapus kolom MonthlyCharges original yang numerik, 
-    df = df.drop('MonthlyCharges', axis=1)
-    df = df.rename(columns={'MonthlyCharges_Category': 'MonthlyCharges'})
-    
-    # Mengatur ulang urutan kolom agar Churn tetap di akhir (opsional tapi rapi)
-    cols = [col for col in df.columns if col != 'Churn'] + ['Churn']
-    df = df[cols]
+    monthly_charges = df['MonthlyCharges'].to_numpy(dtype='float32')
+    df['MonthlyCharges'] = bin_values(monthly_charges, MC_EDGES)
     
     return df
 
@@ -73,68 +162,106 @@ def encode_data(df):
     """
     print("Melakukan Encoding data menggunakan Mapping...")
     
-    mappings = {
-        'InternetService': {
-            'DSL': 0, 
-            'Fiber optic': 1, 
-            'No': 2
-        },
-        'OnlineSecurity': {
-            'No': 0, 
-            'No internet service': 1, 
-            'Yes': 2
-        },
-        'TechSupport': {
-            'No': 0, 
-            'No internet service': 1, 
-            'Yes': 2
-        },
-        'Contract': {
-            'Month-to-month': 0, 
-            'One year': 1, 
-            'Two year': 2
-        },
-        'PaymentMethod': {
-            'Bank transfer (automatic)': 0, 
-            'Credit card (automatic)': 1, 
-            'Electronic check': 2, 
-            'Mailed check': 3
-        },
-        'MonthlyCharges': {
-            'Rendah': 0, 
-            'Sedang': 1, 
-            'Tinggi': 2
-        },
-        'Churn': {
-            'No': 0, 
-            'Yes': 1
-        }
-    }
-    
-    # Terapkan mapping
-    for col, mapping in mappings.items():
+    # Terapkan mapping langsung pada DataFrame yang sama (tanpa salinan baru).
+    # Kolom bertipe category, jadi map hanya melakukan lookup per kategori
+    # (bukan per baris)
+    for col, mapping in MAPPINGS.items():
         if col in df.columns:
             print(f" - Mapping kolom: {col}")
-            # Menggunakan replace agar aman terhadap tipe data category
-            df[col] = df[col].replace(mapping)
+            values = df[col].astype('category')
+            
+            # Nilai di luar mapping akan menjadi NaN, jadi laporkan sebagai error.
+            # Kategori dari baris yang sudah dibuang clean_data tidak ikut diperiksa
+            used = values.cat.remove_unused_categories().cat.categories
+            unknown = used.difference(list(mapping))
+            if len(unknown) > 0:
+                raise ValueError(f"Nilai tidak dikenal pada kolom {col}: {list(unknown)}")
             
             # Pastikan tipe data menjadi integer setelah mapping
-            try:
-                df[col] = df[col].astype(int)
-            except ValueError as e:
-                print(f"   Warning: Gagal convert ke int untuk kolom {col}. Error: {e}")
+            df[col] = values.map(mapping).astype('int8')
+
+    # SeniorCitizen sudah berupa 0/1, cukup disamakan menjadi int8
+    # (tidak ada salinan jika sudah dibaca sebagai int8 di load_data)
+    if 'SeniorCitizen' in df.columns and df['SeniorCitizen'].dtype != 'int8':
+        df['SeniorCitizen'] = df['SeniorCitizen'].astype('int8')
 
     return df
 
-def save_data(df, output_path):
+def write_chunks(chunks, write_chunk):
     """
-    Menyimpan data hasil preprocessing ke file CSV.
+    Menulis setiap chunk dengan `write_chunk(i, chunk)` di thread terpisah,
+    sehingga penulisan satu chunk berjalan bersamaan dengan pembacaan dan
+    transformasi chunk berikutnya. Penulisan tetap berurutan (satu worker)
+    dan maksimal satu chunk yang menunggu ditulis.
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = None
+        for i, chunk in enumerate(chunks):
+            if pending is not None:
+                pending.result()
+            pending = executor.submit(write_chunk, i, chunk)
+        if pending is not None:
+            pending.result()
+
+def save_data(chunks, output_path):
+    """
+    Menyimpan data hasil preprocessing yang datang per chunk.
+    Format ditentukan dari ekstensi file: .parquet, .feather, atau CSV.
+    Parquet dan CSV ditulis bertahap per chunk, Feather ditulis sekaligus.
+    Data ditulis ke file sementara dan baru menggantikan `output_path` setelah
+    semua chunk selesai, sehingga file lama tetap utuh jika terjadi kesalahan.
     """
     # Pastikan folder tujuan ada
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    print(f"Menyimpan data hasil preprocessing ke: {output_path}")
-    df.to_csv(output_path, index=False)
+    # Chunk baru diproses saat diminta, jadi pesan ini dicetak setelah chunk
+    # pertama selesai diproses agar urutan log sesuai urutan pipeline.
+    # CSV tanpa baris data tidak menghasilkan chunk, maka disimpan satu
+    # DataFrame kosong dengan skema int8 agar file output tetap terbentuk
+    def announce(chunks):
+        empty = True
+        for chunk in chunks:
+            if empty:
+                print(f"Menyimpan data hasil preprocessing ke: {output_path}")
+                empty = False
+            yield chunk
+        if empty:
+            print(f"Menyimpan data hasil preprocessing (kosong) ke: {output_path}")
+            yield pd.DataFrame({col: pd.Series(dtype='int8') for col in SELECTED_COLUMNS})
+
+    chunks = announce(chunks)
+    extension = os.path.splitext(output_path)[1].lower()
+    tmp_path = output_path + '.tmp'
+    try:
+        if extension == '.parquet':
+            writer = None
+
+            def write_parquet(i, chunk):
+                nonlocal writer
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema, compression='zstd')
+                writer.write_table(table)
+
+            try:
+                write_chunks(chunks, write_parquet)
+            finally:
+                if writer is not None:
+                    writer.close()
+        elif extension == '.feather':
+            pd.concat(chunks, ignore_index=True).to_feather(tmp_path)
+        else:
+            def write_csv(i, chunk):
+                chunk.to_csv(tmp_path, index=False, mode='w' if i == 0 else 'a', header=i == 0)
+
+            write_chunks(chunks, write_csv)
+    except BaseException:
+        # Hapus file sementara yang belum lengkap, file lama tidak disentuh
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    os.replace(tmp_path, output_path)
     print("Proses selesai!")
 
 def run_preprocessing():
@@ -145,12 +272,13 @@ def run_preprocessing():
     input_file = os.path.join(root_dir, 'Telco-Customer-Churn.csv') # Sesuaikan nama file raw
     # Jika file raw ada di folder khusus, misal: os.path.join(root_dir, 'data_raw', 'Telco-Customer-Churn.csv')
     
-    output_file = os.path.join(base_dir, 'Telco-Customer-Churn_preprocessing.csv')
+    output_file = os.path.join(base_dir, 'Telco-Customer-Churn_preprocessing.parquet')
 
     # --- Eksekusi Pipeline ---
-    try:
-        # 1. Load
-        df = load_data(input_file)
+    # Data diproses per chunk sehingga memori yang dipakai dibatasi satu chunk.
+    # Setelah seleksi fitur, setiap tahap mengubah DataFrame chunk yang sama
+    def process_chunk(i, df):
+        print(f"Memproses chunk {i} ({len(df)} baris)...")
         
         # 2. Clean
         df = clean_data(df)
@@ -162,15 +290,36 @@ def run_preprocessing():
         df = feature_engineering(df)
         
         # 5. Encoding
-        df_processed = encode_data(df)
+        return encode_data(df)
+
+    try:
+        # 1. Load
+        # TotalCharges ikut dimuat karena dipakai di clean_data
+        try:
+            chunks = load_data(
+                input_file,
+                usecols=SELECTED_COLUMNS + ('TotalCharges',),
+                dtype=DTYPE_MAP,
+                na_values=NA_VALUES,
+                block_size=BLOCK_SIZE
+            )
+        except FileNotFoundError:
+            print(f"Error: File dataset tidak ditemukan di {input_file}")
+            sys.exit(1)
         
-        # 6. Save
-        save_data(df_processed, output_file)
+        # 2-6. Proses dan simpan setiap chunk
+        save_data((process_chunk(i, chunk) for i, chunk in enumerate(chunks, 1)), output_file)
         
-    except FileNotFoundError:
-        print(f"Error: File dataset tidak ditemukan di {input_file}")
+    except ValueError as e:
+        # Misalnya nilai kategori di luar MAPPINGS (dari encode_data) atau nilai
+        # yang tidak bisa di-parse sesuai DTYPE_MAP. Karena save_data menulis ke
+        # file sementara, hasil preprocessing sebelumnya tidak ikut berubah
+        print(f"Error: Data tidak valid, file hasil preprocessing tidak diubah. {e}")
+        sys.exit(1)
     except Exception as e:
         print(f"Terjadi kesalahan: {e}")
+        # Exit code non-zero agar CI tidak meng-commit hasil yang gagal
+        sys.exit(1)
 
 if __name__ == "__main__":
     run_preprocessing()
\ No newline at end of file